@@ -9,7 +9,10 @@ if getattr(sys, "frozen", False) and sys.stdin is None:
     sys.stderr = open(os.devnull, "w")
 
 import re
+import shutil
 import subprocess
+import tempfile
+import time
 
 from PyQt5.QtCore import Qt, QThread, QTimer, pyqtSignal
 from PyQt5.QtWidgets import (
@@ -36,56 +39,237 @@ from qfluentwidgets import (
 )
 
 
-# ConversionThread 类保持不变
+# ==================== 【I/O 层：暂存目录、吞吐统计】 ====================
+COPY_CHUNK_SIZE = 8 * 1024 * 1024
+
+
+class ConversionCancelled(Exception):
+    pass
+
+
+def device_of(path):
+    # 文件尚不存在时（例如输出文件），向上查找已存在的目录
+    path = os.path.abspath(path)
+    while not os.path.exists(path):
+        parent = os.path.dirname(path)
+        if parent == path:
+            break
+        path = parent
+    return os.stat(path).st_dev
+
+
 class ConversionThread(QThread):
     progress_signal = pyqtSignal(int)
     log_signal = pyqtSignal(str)
+    status_signal = pyqtSignal(str)
     completed_signal = pyqtSignal(str)
     failed_signal = pyqtSignal(str)
-
-    def __init__(self, cmd, output_file, duration):
+    cancelled_signal = pyqtSignal()
+
+    def __init__(
+        self,
+        cmd,
+        output_file,
+        duration,
+        job_dir="",
+        input_file="",
+        staged_input="",
+        scratch_output="",
+    ):
         super().__init__()
         self.cmd = cmd
         self.output_file = output_file
         self.duration = duration
+        # 使用暂存目录时：input_file → staged_input 预读，FFmpeg 写入 scratch_output
+        self.job_dir = job_dir
+        self.input_file = input_file
+        self.staged_input = staged_input
+        self.scratch_output = scratch_output
+        self.process = None
+        self.cancelled = False
+        self.io_stats = {}
+        # 设备号 → 用于日志显示的代表路径
+        self.device_labels = {}
+
+    def stop(self):
+        # 仅设置取消标志并结束 FFmpeg，由 run() 自行清理并发出结束信号
+        self.cancelled = True
+        process = self.process
+        if process is not None and process.poll() is None:
+            process.kill()
+
+    def check_cancelled(self):
+        if self.cancelled:
+            raise ConversionCancelled()
+
+    def label_device(self, path):
+        device = device_of(path)
+        self.device_labels.setdefault(device, path)
+        return device
+
+    def record(self, path, kind, num_bytes, seconds):
+        stats = self.io_stats.setdefault(
+            self.label_device(os.path.dirname(os.path.abspath(path))),
+            {"read_bytes": 0, "read_time": 0.0, "write_bytes": 0, "write_time": 0.0},
+        )
+        stats[f"{kind}_bytes"] += num_bytes
+        stats[f"{kind}_time"] += seconds
+
+    def copy_file(self, src, dst, durable=False):
+        read_time = write_time = 0.0
+        total = 0
+        with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+            while True:
+                self.check_cancelled()
+                start = time.perf_counter()
+                chunk = fsrc.read(COPY_CHUNK_SIZE)
+                read_time += time.perf_counter() - start
+                if not chunk:
+                    break
+                start = time.perf_counter()
+                fdst.write(chunk)
+                write_time += time.perf_counter() - start
+                total += len(chunk)
+            # 仅最终输出需要落盘保证，暂存数据不做 fsync
+            if durable:
+                start = time.perf_counter()
+                fdst.flush()
+                os.fsync(fdst.fileno())
+                write_time += time.perf_counter() - start
+        shutil.copystat(src, dst)
+        self.record(src, "read", total, read_time)
+        self.record(dst, "write", total, write_time)
+        return total, read_time + write_time
+
+    def stage_input_file(self):
+        self.status_signal.emit("正在预读输入文件到暂存目录...")
+        self.log_signal.emit(f"📥 预读暂存输入: {self.input_file} → {self.staged_input}")
+        total, elapsed = self.copy_file(self.input_file, self.staged_input)
+        rate = total / elapsed / 1024 / 1024 if elapsed > 0 else 0.0
+        self.log_signal.emit(
+            f"📥 预读完成: {total / 1024 / 1024:.1f} MB, {rate:.1f} MB/s"
+        )
+        self.status_signal.emit("正在转换...")
 
-    def run(self):
+    def commit_output(self):
+        # 同设备直接原子替换；跨设备先复制为临时文件，再原子替换到最终位置
+        self.log_signal.emit(f"📦 移动输出到: {self.output_file}")
+        if device_of(self.scratch_output) == device_of(self.output_file):
+            os.replace(self.scratch_output, self.output_file)
+            return
+        partial = self.output_file + ".part"
         try:
-            process = subprocess.Popen(
-                self.cmd,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.STDOUT,
-                universal_newlines=True,
-                creationflags=subprocess.CREATE_NO_WINDOW if os.name == "nt" else 0,
+            self.copy_file(self.scratch_output, partial, durable=True)
+            os.replace(partial, self.output_file)
+        finally:
+            if os.path.exists(partial):
+                os.remove(partial)
+
+    def log_throughput(self):
+        for device, stats in self.io_stats.items():
+            read_rate = (
+                stats["read_bytes"] / stats["read_time"] / 1024 / 1024
+                if stats["read_time"] > 0
+                else 0.0
+            )
+            write_rate = (
+                stats["write_bytes"] / stats["write_time"] / 1024 / 1024
+                if stats["write_time"] > 0
+                else 0.0
+            )
+            label = self.device_labels.get(device, "")
+            self.log_signal.emit(
+                f"📊 本次任务 {label} (设备 {device}): "
+                f"读 {read_rate:.1f} MB/s, 写 {write_rate:.1f} MB/s"
             )
 
-            for line in iter(process.stdout.readline, ""):
-                if process.poll() is not None:
-                    break
-                line = line.strip()
-                if line.startswith("out_time_ms="):
-                    try:
-                        time_ms = int(line.split("=")[1])
-                        if self.duration > 0:
-                            progress = min(
-                                (time_ms / 1000000) / self.duration * 100, 100
-                            )
-                            self.progress_signal.emit(int(progress))
-                    except:
-                        pass
-                if any(
-                    keyword in line.lower()
-                    for keyword in ["error", "warning", "frame=", "time=", "bitrate="]
-                ):
-                    self.log_signal.emit(f"📋 {line}")
-
-            return_code = process.wait()
+    def run(self):
+        keep_job_dir = False
+        try:
+            # 先登记输入、暂存、输出目录，日志中按这些路径显示设备
+            self.label_device(os.path.dirname(os.path.abspath(self.input_file)))
+            if self.job_dir:
+                self.label_device(os.path.dirname(self.job_dir))
+            self.label_device(os.path.dirname(os.path.abspath(self.output_file)))
+
+            if self.staged_input:
+                self.stage_input_file()
+            self.check_cancelled()
+
+            started = time.perf_counter()
+            return_code = self.run_ffmpeg()
+            elapsed = time.perf_counter() - started
+            self.check_cancelled()
+
             if return_code == 0:
-                self.completed_signal.emit(self.output_file)
+                # FFmpeg 编码过程的读写同样计入各设备的吞吐
+                encode_input = self.staged_input or self.input_file
+                encode_output = self.scratch_output or self.output_file
+                self.record(
+                    encode_input, "read", os.path.getsize(encode_input), elapsed
+                )
+                self.record(
+                    encode_output, "write", os.path.getsize(encode_output), elapsed
+                )
+                if self.scratch_output:
+                    try:
+                        self.commit_output()
+                    except ConversionCancelled:
+                        raise
+                    except Exception as e:
+                        # 暂存目录中保留着唯一完整的转换结果，不能删除
+                        keep_job_dir = True
+                        raise RuntimeError(
+                            f"移动输出失败: {e}，转换结果保留在: {self.scratch_output}"
+                        )
+                finish = (self.completed_signal, self.output_file)
             else:
-                self.failed_signal.emit("转换过程中出现错误")
+                finish = (self.failed_signal, "转换过程中出现错误")
+        except ConversionCancelled:
+            finish = (self.cancelled_signal,)
         except Exception as e:
-            self.failed_signal.emit(str(e))
+            if self.cancelled and not keep_job_dir:
+                finish = (self.cancelled_signal,)
+            else:
+                finish = (self.failed_signal, str(e))
+        finally:
+            self.log_throughput()
+            if self.job_dir and not keep_job_dir:
+                shutil.rmtree(self.job_dir, ignore_errors=True)
+        finish[0].emit(*finish[1:])
+
+    def run_ffmpeg(self):
+        self.process = subprocess.Popen(
+            self.cmd,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            universal_newlines=True,
+            creationflags=subprocess.CREATE_NO_WINDOW if os.name == "nt" else 0,
+        )
+        # stop() 可能恰好发生在进程创建之前
+        if self.cancelled:
+            self.process.kill()
+        process = self.process
+
+        for line in iter(process.stdout.readline, ""):
+            if process.poll() is not None:
+                break
+            line = line.strip()
+            if line.startswith("out_time_ms="):
+                try:
+                    time_ms = int(line.split("=")[1])
+                    if self.duration > 0:
+                        progress = min((time_ms / 1000000) / self.duration * 100, 100)
+                        self.progress_signal.emit(int(progress))
+                except:
+                    pass
+            if any(
+                keyword in line.lower()
+                for keyword in ["error", "warning", "frame=", "time=", "bitrate="]
+            ):
+                self.log_signal.emit(f"📋 {line}")
+
+        return process.wait()
 
 
 class FFmpegFluentApp(QMainWindow):
@@ -121,6 +305,9 @@ class FFmpegFluentApp(QMainWindow):
         self.frame_rate = "Same as source"
         self.resolution = "Same as source"
         # 删除了音频码率的变量初始化
+        # 暂存目录为空时直接写入 output_dir
+        self.scratch_dir = ""
+        self.stage_input = False
 
     def setup_directories(self):
         self.current_dir = os.getcwd()
@@ -301,6 +488,24 @@ class FFmpegFluentApp(QMainWindow):
         options_layout.addWidget(resolution_label, 1, 0)
         options_layout.addWidget(self.resolution_combo, 1, 1)
 
+        # 暂存目录选项
+        scratch_label = QLabel("暂存目录:")
+        self.scratch_entry = LineEdit()
+        self.scratch_entry.setPlaceholderText("留空则直接写入输出文件夹（建议选择 SSD）")
+        self.scratch_entry.textChanged.connect(self.on_scratch_dir_changed)
+        scratch_button = PushButton("选择目录")
+        scratch_button.clicked.connect(self.select_scratch_dir)
+        options_layout.addWidget(scratch_label, 2, 0)
+        options_layout.addWidget(self.scratch_entry, 2, 1)
+        options_layout.addWidget(scratch_button, 2, 2)
+
+        self.stage_checkbox = CheckBox("预读输入文件到暂存目录")
+        self.stage_checkbox.setEnabled(False)
+        self.stage_checkbox.stateChanged.connect(
+            lambda state: setattr(self, "stage_input", state == Qt.Checked)
+        )
+        options_layout.addWidget(self.stage_checkbox, 3, 1)
+
         settings_layout.addWidget(options_frame)
         self.main_layout.addWidget(settings_card)
 
@@ -385,6 +590,20 @@ class FFmpegFluentApp(QMainWindow):
                 self.file_entry.setText(self.input_path)
                 self.log_message(f"✅ 已选择文件: {os.path.basename(self.input_path)}")
 
+    def select_scratch_dir(self):
+        directory = QFileDialog.getExistingDirectory(self, "选择暂存目录")
+        if directory:
+            self.scratch_entry.setText(directory)
+            self.log_message(f"✅ 已设置暂存目录: {directory}")
+
+    def on_scratch_dir_changed(self, text):
+        self.scratch_dir = text.strip()
+        # 预读依赖暂存目录，未设置时禁用
+        self.stage_checkbox.setEnabled(bool(self.scratch_dir))
+        if not self.scratch_dir:
+            self.stage_checkbox.setChecked(False)
+            self.stage_input = False
+
     def on_format_changed(self, format_text):
         self.output_format = format_text
         unsupported_gpu_formats = [
@@ -443,7 +662,24 @@ class FFmpegFluentApp(QMainWindow):
             self.output_dir, f"{base_name}_converted.{self.output_format}"
         )
 
-        cmd = self.build_ffmpeg_command(self.input_path, output_file)
+        # 使用暂存目录时，FFmpeg 直接读写暂存目录中的文件，完成后再移动到 output_dir
+        job_dir = staged_input = scratch_output = ""
+        if self.scratch_dir:
+            try:
+                os.makedirs(self.scratch_dir, exist_ok=True)
+                job_dir = tempfile.mkdtemp(prefix="ffa_", dir=self.scratch_dir)
+            except OSError as e:
+                MessageBox("错误", f"无法使用暂存目录: {str(e)}", self).exec_()
+                return
+            if self.stage_input:
+                staged_input = os.path.join(
+                    job_dir, os.path.basename(self.input_path)
+                )
+            scratch_output = os.path.join(job_dir, os.path.basename(output_file))
+
+        cmd = self.build_ffmpeg_command(
+            staged_input or self.input_path, scratch_output or output_file
+        )
         duration = self.get_video_duration(self.input_path)
 
         self.convert_button.setEnabled(False)
@@ -455,13 +691,25 @@ class FFmpegFluentApp(QMainWindow):
 
         self.log_message(f"🚀 开始转换: {os.path.basename(self.input_path)}")
         self.log_message(f"📁 输出文件: {os.path.basename(output_file)}")
+        if job_dir:
+            self.log_message(f"💾 暂存目录: {job_dir}")
         self.log_message(f"⚙️ 命令: {' '.join(cmd)}")
 
-        self.conversion_thread = ConversionThread(cmd, output_file, duration)
+        self.conversion_thread = ConversionThread(
+            cmd,
+            output_file,
+            duration,
+            job_dir=job_dir,
+            input_file=self.input_path,
+            staged_input=staged_input,
+            scratch_output=scratch_output,
+        )
         self.conversion_thread.progress_signal.connect(self.update_progress)
         self.conversion_thread.log_signal.connect(self.log_message)
+        self.conversion_thread.status_signal.connect(self.status_label.setText)
         self.conversion_thread.completed_signal.connect(self.conversion_completed)
         self.conversion_thread.failed_signal.connect(self.conversion_failed)
+        self.conversion_thread.cancelled_signal.connect(self.conversion_cancelled)
         self.conversion_thread.start()
 
     def build_ffmpeg_command(self, input_file, output_file):
@@ -573,10 +821,19 @@ class FFmpegFluentApp(QMainWindow):
         self.stop_button.setEnabled(False)
         self.log_message(f"💥 转换失败: {error_message}")
 
+    def conversion_cancelled(self):
+        self.convert_button.setEnabled(True)
+        self.stop_button.setEnabled(False)
+        self.status_label.setText("转换已停止")
+        self.log_message("⏹ 用户停止了转换")
+
     def stop_conversion(self):
+        # 不在界面线程中等待，由线程结束时发出的信号更新界面状态
         if self.conversion_thread and self.conversion_thread.isRunning():
-            self.conversion_thread.terminate()
-            self.log_message("⏹ 用户停止了转换")
+            self.conversion_thread.stop()
+            self.stop_button.setEnabled(False)
+            self.status_label.setText("正在停止...")
+            return
         self.convert_button.setEnabled(True)
         self.stop_button.setEnabled(False)
         self.status_label.setText("转换已停止")
@@ -605,6 +862,7 @@ FFmpeg Assistant - 使用指南
 • 实时进度显示和日志输出
 • 简洁的 Fluent 2 设计界面
 • 支持帧率、分辨率调整
+• 可选暂存目录：先写入高速磁盘，完成后原子移动到输出文件夹
 
 📋 使用步骤:
 1. 点击"浏览文件"选择要转换的媒体文件
@@ -618,6 +876,8 @@ FFmpeg Assistant - 使用指南
 • 启用 GPU 加速可显著提升转换速度
 • 大文件转换时请耐心等待
 • 支持在转换过程中随时停止
+• 输入位于 NAS / 机械硬盘时，可设置 SSD 暂存目录并启用预读
+• 日志中会显示本次任务各存储设备的读写吞吐
 
 🔧 技术支持:
 基于 FFmpeg 开源项目构建